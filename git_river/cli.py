@@ -16,33 +16,68 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
+import logging
+import logging.handlers
+
 import click
-import pydantic.error_wrappers
-
-import git_river
-import git_river.commands
-import git_river.commands.clone
-import git_river.commands.forge
-import git_river.commands.config
-import git_river.commands.repo
-import git_river.config
-
-
-@click.group()
-@click.pass_context
-def main(ctx: click.Context) -> None:
-    git_river.config.configure_logging()
-    try:
-        ctx.obj = git_river.config.Config()
-    except pydantic.error_wrappers.ValidationError as error:
-        raise click.UsageError(str(error)) from error
-
-
-main.add_command(git_river.commands.clone.main)
-main.add_command(git_river.commands.config.main)
-main.add_command(git_river.commands.forge.main)
-main.add_command(git_river.commands.repo.update_remotes)
-main.add_command(git_river.commands.repo.merge_feature_branches)
-main.add_command(git_river.commands.repo.tidy_branches)
-main.add_command(git_river.commands.repo.rebase)
-main.add_command(git_river.commands.repo.end)
+import structlog
+
+import git_river.ext.click
+from git_river.paths import cache_directory
+
+
+@click.group(
+    cls=git_river.ext.click.LazyGroup,
+    lazy_commands={
+        "clone": "git_river.commands.clone:main",
+        "config": "git_river.commands.config:main",
+        "forge": "git_river.commands.forge:main",
+        "update": "git_river.commands.repo:update_remotes",
+        "merge": "git_river.commands.repo:merge_feature_branches",
+        "tidy": "git_river.commands.repo:tidy_branches",
+        "rebase": "git_river.commands.repo:rebase",
+        "end": "git_river.commands.repo:end",
+    },
+    # Kept in sync with each command's docstring, so that '--help' doesn't import every command.
+    lazy_help={
+        "clone": "Clone repositories to the workspace path.",
+        "config": "Manage git-river's own configuration file.",
+        "forge": "Clone and manage repositories from GitLab and GitHub in bulk.",
+        "update": "Update and prune all remotes.",
+        "merge": "Merge feature branches into a new 'merged' branch.",
+        "tidy": "Remove branches that have been merged into a mainline branch.",
+        "rebase": "Rebase the currently checked out branch using the upstream mainline branch.",
+        "end": (
+            "Prepare to start a new feature branch by returning to upstream/master and cleaning "
+            "up."
+        ),
+    },
+)
+def main() -> None:
+    configure_logging()
+
+
+def configure_logging() -> None:
+    structlog.configure(
+        processors=[
+            structlog.processors.add_log_level,
+            structlog.processors.StackInfoRenderer(),
+            structlog.dev.set_exc_info,
+            structlog.processors.format_exc_info,
+            structlog.dev.ConsoleRenderer(sort_keys=False),
+        ],
+        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+        logger_factory=structlog.PrintLoggerFactory(),
+        cache_logger_on_first_use=True,
+    )
+
+    cache_directory().mkdir(exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        filename=str(cache_directory() / "debug.log"),
+        maxBytes=1024 * 1024,
+        # Don't open the log file until something is logged to it.
+        delay=True,
+    )
+    handler.setFormatter(logging.Formatter("{asctime}:{levelname}:{name}:{message}", style="{"))
+    logging.getLogger().addHandler(handler)
+    logging.getLogger().setLevel(logging.DEBUG)
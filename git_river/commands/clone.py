@@ -34,7 +34,7 @@ logger = structlog.get_logger(logger_name=__name__)
     type=click.STRING,
     nargs=-1,
 )
-@click.pass_obj
+@git_river.config.pass_config
 def main(config: git_river.config.Config, urls: typing.Sequence[str]) -> None:
     """Clone repositories to the workspace path."""
     for url in urls:
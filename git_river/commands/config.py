@@ -19,11 +19,6 @@ import pathlib
 
 import click
 
-import git_river
-import git_river.commands
-import git_river.commands.clone
-import git_river.commands.forge
-import git_river.commands.repo
 import git_river.config
 
 
@@ -34,7 +29,7 @@ def main():
 
 
 @main.command(name="display")
-@click.pass_obj
+@git_river.config.pass_config
 def display_config(config: git_river.config.Config) -> None:
     """Dump the current configuration as JSON."""
     print(config.json(indent=2, by_alias=True))
@@ -50,23 +45,24 @@ def display_config(config: git_river.config.Config) -> None:
         path_type=pathlib.Path,
     ),
 )
-@click.pass_obj
-def init_config(config: git_river.config.Config, workspace: str) -> None:
+@git_river.config.pass_config
+def init_config(config: git_river.config.Config, workspace: pathlib.Path) -> None:
     """Create the configuration file."""
 
-    config.workspace = pathlib.Path(workspace)
+    config_path = git_river.config.config_path()
+    if config_path.exists():
+        raise click.UsageError(f"Config file {config_path} already exists")
 
-    if git_river.config.CONFIG_PATH.exists():
-        raise click.UsageError(f"Config file {git_river.config.CONFIG_PATH} already exists")
+    if not config_path.parent.exists():
+        config_path.parent.mkdir()
 
-    if not git_river.config.CONFIG_DIRECTORY.exists():
-        git_river.config.CONFIG_DIRECTORY.mkdir()
-
-    git_river.config.CONFIG_PATH.write_text(config.json(indent=2, by_alias=True))
+    # copy() doesn't re-run validation, unlike constructing a new Config.
+    config = config.copy(update={"workspace": workspace})
+    config_path.write_text(config.json(indent=2, by_alias=True))
 
 
 @main.command(name="workspace")
-@click.pass_obj
+@git_river.config.pass_config
 def display_workspace(config: git_river.config.Config) -> None:
     """Print the workspace path."""
     print(config.workspace)
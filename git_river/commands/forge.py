@@ -18,8 +18,12 @@
 
 from __future__ import annotations
 
+import collections
+import concurrent.futures
 import dataclasses
-import itertools
+import os
+import pathlib
+import threading
 import typing
 
 import click
@@ -40,21 +44,56 @@ class RepositoryManager:
         default_factory=list
     )
 
+    # Whether each repository's path exists, checked once and shared by all subcommands.
+    _exists: typing.Optional[typing.Dict[pathlib.Path, bool]] = dataclasses.field(
+        default=None, init=False, repr=False
+    )
+
     def extend(self, repos: typing.Iterable[git_river.repository.RemoteRepository]) -> None:
         self.repos.extend(repos)
+        self._exists = None
 
     def filter(self, f: typing.Callable[[git_river.repository.RemoteRepository], bool]) -> None:
         self.repos = [repo for repo in self.repos if f(repo)]
 
-    def missing(self) -> typing.Sequence[git_river.repository.RemoteRepository]:
-        return [repo for repo in self.repos if not repo.path.exists() and not repo.archived]
+    def cloned(self, repo: git_river.repository.RemoteRepository) -> None:
+        self._refresh_exists()[repo.path] = True
+
+    def missing(self) -> typing.Iterator[git_river.repository.RemoteRepository]:
+        exists = self._refresh_exists()
+        return (repo for repo in self.repos if not repo.archived and not exists[repo.path])
 
-    def existing(self) -> typing.Sequence[git_river.repository.LocalRepository]:
-        return [repo.as_local_repo() for repo in self.repos if repo.path.exists()]
+    def existing(self) -> typing.Iterator[git_river.repository.LocalRepository]:
+        exists = self._refresh_exists()
+        return (repo.as_local_repo() for repo in self.repos if exists[repo.path])
+
+    def count_existing(self) -> int:
+        exists = self._refresh_exists()
+        return sum(1 for repo in self.repos if exists[repo.path])
 
     def empty(self) -> bool:
         return len(self.repos) == 0
 
+    def _refresh_exists(self) -> typing.Dict[pathlib.Path, bool]:
+        if self._exists is None:
+            # Repositories share a handful of parent directories (one per group), so list each
+            # parent once instead of calling stat() on every repository path.
+            parents = {repo.path.parent for repo in self.repos}
+            children = {parent: list_directory(parent) for parent in parents}
+            self._exists = {
+                repo.path: repo.path.name in children[repo.path.parent] for repo in self.repos
+            }
+
+        return self._exists
+
+
+def list_directory(path: pathlib.Path) -> typing.Set[str]:
+    try:
+        with os.scandir(path) as entries:
+            return {entry.name for entry in entries}
+    except (FileNotFoundError, NotADirectoryError):
+        return set()
+
 
 T = typing.TypeVar("T")
 
@@ -63,6 +102,15 @@ def value_or_default(value: typing.Optional[T], default: T) -> T:
     return default if value is None else value
 
 
+def display_path(repo: git_river.repository.Repository) -> str:
+    return repo.path.as_posix()
+
+
+def default_jobs() -> int:
+    """Clones and fetches are network-bound, so run more of them than there are CPUs."""
+    return min(32, (os.cpu_count() or 1) * 2)
+
+
 @click.group(name="forge", invoke_without_command=True)
 @click.option(
     "-f",
@@ -102,6 +150,20 @@ def value_or_default(value: typing.Optional[T], default: T) -> T:
     is_flag=True,
     help="Use repositories from the authenticated user.",
 )
+@click.option(
+    "--max-concurrent",
+    "max_concurrent",
+    type=click.IntRange(min=1),
+    default=8,
+    show_default=True,
+    help="Number of API requests to make in parallel when listing repositories.",
+)
+@click.option(
+    "--refresh",
+    "refresh",
+    is_flag=True,
+    help="Download repository listings again instead of using cached responses.",
+)
 @click.pass_context
 def main(
     ctx: click.Context,
@@ -109,6 +171,8 @@ def main(
     select_groups: typing.Sequence[str],
     select_users: typing.Sequence[str],
     select_self: typing.Optional[bool],
+    max_concurrent: int,
+    refresh: bool,
 ) -> None:
     """
     Clone and manage repositories from GitLab and GitHub in bulk.
@@ -119,26 +183,43 @@ def main(
     Invokes the 'clone', 'archived', 'configure', and 'remotes' subcommands when no subcommand is
     given.
     """
-    config = ctx.ensure_object(git_river.config.Config)
+    config = git_river.config.load_config(ctx)
     ctx.obj = RepositoryManager()
 
+    if refresh:
+        git_river.config.http_cache().refresh = True
+
     if select_forges:
         forges_config = config.select_forges(select_forges)
     else:
         forges_config = config.all_forges()
 
+    workspace = config.require_workspace()
+
+    # Shared by every forge, so that '--max-concurrent' bounds all API requests made at once.
+    request_slots = threading.BoundedSemaphore(max_concurrent)
+    listings: typing.List[git_river.config.Listing] = []
     for forge_config in forges_config:
         if any((select_self is not None, select_users, select_groups)):
-            ctx.obj.extend(
-                forge_config.select_repositories(
-                    workspace=config.workspace,
+            listings.extend(
+                forge_config.select_listings(
+                    workspace=workspace,
+                    request_slots=request_slots,
                     select_self=value_or_default(select_self, False),
                     select_users=value_or_default(select_users, []),
                     select_groups=value_or_default(select_groups, []),
                 )
             )
         else:
-            ctx.obj.extend(forge_config.all_repositories(workspace=config.workspace))
+            listings.extend(
+                forge_config.all_listings(workspace=workspace, request_slots=request_slots)
+            )
+
+    # Listing repositories is dominated by waiting on each forge's API, so fetch every group and
+    # user listing from every forge in one pool. Results are still added in the configured order.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrent) as executor:
+        for repositories in executor.map(git_river.config.materialize, listings):
+            ctx.obj.extend(repositories)
 
     if ctx.obj.empty():
         ctx.fail("No repositories selected")
@@ -151,31 +232,63 @@ def main(
 
 
 @main.command(name="clone")
+@click.option(
+    "-j",
+    "--jobs",
+    "jobs",
+    type=click.IntRange(min=1),
+    default=default_jobs,
+    help="Number of repositories to clone in parallel.",
+)
 @click.pass_obj
-def clone_repositories(workspace: RepositoryManager) -> None:
+def clone_repositories(workspace: RepositoryManager, jobs: int) -> None:
     """Clone all repositories from the configured users and groups."""
-    repositories = workspace.missing()
+    repositories = list(workspace.missing())
     if not repositories:
         logger.debug("No repositories to clone")
         return
 
-    logger.info("Cloning missing repositories", repositories=len(repositories))
-    groups = itertools.groupby(repositories, key=lambda r: r.group)
+    logger.info("Cloning missing repositories", repositories=len(repositories), jobs=jobs)
+    groups: typing.Dict[
+        typing.Optional[str], typing.List[git_river.repository.RemoteRepository]
+    ] = collections.defaultdict(list)
+    for repo in repositories:
+        groups[repo.group].append(repo)
+
     cloned = []
-    for group, iterable in groups:
+    failed = []
+    for group, group_repositories in groups.items():
         with git_river.ext.click.progressbar(
-            iterable=list(iterable),
+            length=len(group_repositories),
             event="Cloning missing repositories",
-            item_show_func=lambda p: p.path.as_posix(),
+            item_show_func=display_path,
             logger_name=__name__,
             group=str(group),
-        ) as progress:
-            for repo in progress:
-                repo.clone(verbose=False)
-                cloned.append(repo)
+        ) as progress, concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                executor.submit(repo.clone, verbose=False): repo for repo in group_repositories
+            }
+            for future in concurrent.futures.as_completed(futures):
+                repo = futures[future]
+                try:
+                    future.result()
+                except Exception as clone_error:
+                    failed.append((repo, clone_error))
+                else:
+                    workspace.cloned(repo)
+                    cloned.append(repo)
+                progress.update(1, repo)
 
     for local_repo in cloned:
-        local_repo.bind(logger).info("Cloned repository")
+        logger.info("Cloned repository", name=local_repo.name)
+
+    for repo, error in failed:
+        logger.error("Failed to clone repository", name=repo.name, error=str(error).strip())
+
+    if failed:
+        raise click.ClickException(
+            f"Failed to clone {len(failed)} of {len(repositories)} repositories"
+        )
 
 
 @main.command(name="archived")
@@ -191,9 +304,8 @@ def archived_repositories(workspace: RepositoryManager) -> None:
 @click.pass_obj
 def configure_options(workspace: RepositoryManager) -> None:
     """Configure repository settings using the config file."""
-    repositories = workspace.existing()
-    logger.info("Configuring repository options", repositories=len(repositories))
-    for repo in repositories:
+    logger.info("Configuring repository options", repositories=workspace.count_existing())
+    for repo in workspace.existing():
         repo.configure_options()
 
 
@@ -201,24 +313,43 @@ def configure_options(workspace: RepositoryManager) -> None:
 @click.pass_obj
 def configure_remotes(workspace: RepositoryManager) -> None:
     """Configure remotes from API metadata."""
-    repositories = workspace.existing()
-    logger.info("Configuring repository remotes", repositories=len(repositories))
-    for repo in repositories:
+    logger.info("Configuring repository remotes", repositories=workspace.count_existing())
+    for repo in workspace.existing():
         repo.configure_remotes()
 
 
 @main.command(name="update")
+@click.option(
+    "-j",
+    "--jobs",
+    "jobs",
+    type=click.IntRange(min=1),
+    default=default_jobs,
+    help="Number of repositories to fetch in parallel.",
+)
 @click.pass_obj
-def update_remotes(workspace: RepositoryManager) -> None:
+def update_remotes(workspace: RepositoryManager, jobs: int) -> None:
     """Fetch configured remotes for each repository."""
+    repositories = list(workspace.existing())
+    failed = []
     with git_river.ext.click.progressbar(
-        iterable=workspace.existing(),
+        length=len(repositories),
         event="Fetching repository remotes",
         item_show_func=str,
         logger_name=__name__,
     ) as progress:
-        for repo in progress:
-            repo.update_remotes()
+        for repo, error in git_river.repository.update_remotes_bulk(repositories, jobs=jobs):
+            if error is not None:
+                failed.append((repo, error))
+            progress.update(1, repo)
+
+    for repo, error in failed:
+        logger.error("Failed to update remotes", name=repo.name, error=str(error).strip())
+
+    if failed:
+        raise click.ClickException(
+            f"Failed to update remotes for {len(failed)} of {len(repositories)} repositories"
+        )
 
 
 @main.command(name="tidy")
@@ -258,4 +389,4 @@ def tidy(workspace: RepositoryManager, dry_run: bool, target: typing.Optional[st
 def list_repositories(workspace: RepositoryManager) -> None:
     """List all repositories from the configured users and groups."""
     for repo in workspace.existing():
-        repo.bind(logger).info("Repository exists", remotes=repo.remote_names)
+        logger.info("Repository exists", name=repo.name, remotes=repo.remote_names)
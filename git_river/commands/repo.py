@@ -24,17 +24,13 @@ import typing
 import click
 import structlog
 
-import git_river.config
-import git_river.ext.click
-import git_river.repository
-
 logger = structlog.get_logger(logger_name=__name__)
 
 
 click_repo_option = click.option(
     "--repo",
     "path",
-    default=pathlib.Path.cwd(),
+    default=pathlib.Path.cwd,
     type=click.Path(
         exists=True,
         file_okay=False,
@@ -93,6 +89,8 @@ click_mainline_option = click.option(
 @click_repo_option
 def update_remotes(path: pathlib.Path) -> None:
     """Update and prune all remotes."""
+    import git_river.repository
+
     git_river.repository.LocalRepository.from_path(path).update_remotes()
 
 
@@ -113,6 +111,8 @@ def merge_feature_branches(path: pathlib.Path, mainline: typing.Optional[str], m
 
     By default, merges all branches prefixed 'feature/' into a branch named 'merged'.
     """
+    import git_river.repository
+
     repo = git_river.repository.LocalRepository.from_path(path)
 
     mainline = repo.discover_mainline_branch(mainline)
@@ -137,6 +137,8 @@ def tidy_branches(path: pathlib.Path, dry_run: bool, mainline: typing.Optional[s
     If --branch is not set, uses the repositories configured default branch (for repositories
     discovered from a remote API), or the first branch found from 'main' and 'master'.
     """
+    import git_river.repository
+
     repo = git_river.repository.LocalRepository.from_path(path)
 
     mainline = repo.discover_mainline_branch(mainline)
@@ -157,6 +159,8 @@ def rebase(
     """
     Rebase the currently checked out branch using the upstream mainline branch.
     """
+    import git_river.repository
+
     repo = git_river.repository.LocalRepository.from_path(path)
 
     upstream = repo.discover_upstream_remote(upstream)
@@ -188,6 +192,8 @@ def end(
     - Fetch all remotes and prunes local references to remote branches.
     - Pushes the mainline branch to the downstream remote (if a downstream remote exists).
     """
+    import git_river.repository
+
     repo = git_river.repository.LocalRepository.from_path(path)
     upstream = repo.discover_upstream_remote(upstream)
     mainline = repo.discover_mainline_branch()
@@ -19,59 +19,114 @@
 from __future__ import annotations
 
 import abc
+import atexit
+import functools
 import json
-import logging
-import logging.handlers
+import os
 import pathlib
+import threading
 import typing
 
-import appdirs
 import click
-import github
-import github.MainClass
-import github.Repository
-import gitlab
-import gitlab.v4.objects
 import pydantic
 import structlog
-import structlog.stdlib
 
-import git_river
+from git_river.paths import cache_directory, config_path
 from git_river.repository import GitConfig, GitConfigKey, RemoteRepository
-from git_river.forge import GitHub, GitLab
+
+if typing.TYPE_CHECKING:
+    import requests
+
+    import git_river.ext.requests
+    from git_river.forge import GitHub, GitLab
 
 logger = structlog.get_logger(logger_name=__name__)
 
-CONFIG_DIRECTORY = pathlib.Path(appdirs.user_config_dir(git_river.__app__))
-CACHE_DIRECTORY = pathlib.Path(appdirs.user_cache_dir(git_river.__app__))
-CONFIG_PATH = CONFIG_DIRECTORY / "config.json"
+T = typing.TypeVar("T")
+
+Listing = typing.Callable[[], typing.Iterable[RemoteRepository]]
+ForgeKey = typing.Tuple[pathlib.Path, threading.Semaphore]
+
+
+@functools.lru_cache(maxsize=None)
+def http_cache() -> git_river.ext.requests.ETagCacheAdapter:
+    """Responses are cached by ETag, so that unchanged listings are not downloaded again."""
+    import git_river.ext.requests
+
+    adapter = git_river.ext.requests.ETagCacheAdapter(
+        path=cache_directory() / "http.json",
+        pool_connections=16,
+        pool_maxsize=32,
+    )
+    atexit.register(adapter.save)
+    return adapter
+
+
+@functools.lru_cache(maxsize=None)
+def http_session() -> requests.Session:
+    """
+    A HTTP session shared by all GitLab clients, so that connections are reused across forges.
+
+    The connection pool is sized for forges being listed in parallel.
+    """
+    import requests
+
+    session = requests.Session()
+    session.mount("https://", http_cache())
+    session.mount("http://", http_cache())
+    return session
+
+
+def materialize(listing: Listing) -> typing.List[RemoteRepository]:
+    """Fetch every repository from a listing, which is a series of paginated requests."""
+    return list(listing())
 
 
 class ForgeConfig(pydantic.BaseModel, abc.ABC):
     gitconfig: typing.Mapping[str, typing.Optional[str]] = pydantic.Field(default_factory=dict)
 
+    if typing.TYPE_CHECKING:
+        # Declared by subclasses, so that it keeps its position in the serialised config.
+        base_url: pydantic.HttpUrl
+
+    _git_config_options: typing.Optional[GitConfig] = pydantic.PrivateAttr(default=None)
+
     class Config:
         # Validate default values - essential so that base_url is converted to pydantic.HttpUrl.
         validate_all = True
 
+    @property
+    def domain(self) -> str:
+        if self.base_url.host is None:
+            raise Exception(f"Could not determine host for {self.base_url!r}")
+
+        return self.base_url.host
+
     def git_config_options(self) -> GitConfig:
-        return {GitConfigKey.parse(key): value for key, value in self.gitconfig.items()}
+        if self._git_config_options is None:
+            self._git_config_options = {
+                GitConfigKey.parse(key): value for key, value in self.gitconfig.items()
+            }
+
+        return self._git_config_options
 
     @abc.abstractmethod
-    def all_repositories(
+    def all_listings(
         self,
         workspace: pathlib.Path,
-    ) -> typing.Iterable[RemoteRepository]:
+        request_slots: threading.Semaphore,
+    ) -> typing.List[Listing]:
         raise NotImplementedError
 
     @abc.abstractmethod
-    def select_repositories(
+    def select_listings(
         self,
         workspace: pathlib.Path,
+        request_slots: threading.Semaphore,
         select_self: bool,
         select_users: typing.Sequence[str],
         select_groups: typing.Sequence[str],
-    ) -> typing.Iterable[RemoteRepository]:
+    ) -> typing.List[Listing]:
         raise NotImplementedError
 
 
@@ -85,67 +140,85 @@ class GitHubConfig(ForgeConfig):
     organizations: typing.Sequence[str] = pydantic.Field(default_factory=list)
     self: bool = pydantic.Field(default=True)
 
-    def forge(self, workspace: pathlib.Path) -> GitHub:
-        if self.base_url.host is None:
-            raise Exception(f"Could not determine host for {self.base_url!r}")
+    _forges: typing.Dict[ForgeKey, GitHub] = pydantic.PrivateAttr(default_factory=dict)
+
+    @property
+    def domain(self) -> str:
+        return super().domain.removeprefix("api.")
+
+    def forge(self, workspace: pathlib.Path, request_slots: threading.Semaphore) -> GitHub:
+        """Create a client for the forge, reused by later calls with the same arguments."""
+        if (workspace, request_slots) in self._forges:
+            return self._forges[workspace, request_slots]
 
-        domain = self.base_url.host
-        if domain.startswith("api."):
-            domain = domain.removeprefix("api.")
+        import github
 
-        client = github.Github(
+        from git_river.forge import GitHub
+
+        client_factory = functools.partial(
+            github.Github,
             base_url=self.base_url,
             login_or_token=self.login_or_token.get_secret_value(),
         )
 
-        return GitHub(
-            client=client,
-            domain=domain,
+        forge = self._forges[workspace, request_slots] = GitHub(
+            client_factory=client_factory,
+            domain=self.domain,
             gitconfig=self.git_config_options(),
             workspace=workspace,
+            request_slots=request_slots,
         )
+        return forge
 
-    def all_repositories(
+    def all_listings(
         self,
         workspace: pathlib.Path,
-    ) -> typing.Iterable[RemoteRepository]:
-        forge = self.forge(workspace)
+        request_slots: threading.Semaphore,
+    ) -> typing.List[Listing]:
+        forge = self.forge(workspace, request_slots)
+        listings: typing.List[Listing] = []
 
         for organization in self.organizations:
-            yield from forge.repositories_organization(organization)
+            listings.append(functools.partial(forge.repositories_organization, organization))
 
         for user in self.users:
-            yield from forge.repositories_user(user)
+            listings.append(functools.partial(forge.repositories_user, user))
 
         if self.self:
-            yield from forge.repositories_self()
+            listings.append(forge.repositories_self)
 
-    def select_repositories(
+        return listings
+
+    def select_listings(
         self,
         workspace: pathlib.Path,
+        request_slots: threading.Semaphore,
         select_self: bool,
         select_users: typing.Sequence[str],
         select_groups: typing.Sequence[str],
-    ) -> typing.Iterable[RemoteRepository]:
-        forge = self.forge(workspace)
+    ) -> typing.List[Listing]:
+        forge = self.forge(workspace, request_slots)
+        listings: typing.List[Listing] = []
 
         for organization in self.organizations:
             if organization in select_groups:
-                yield from forge.repositories_organization(organization)
+                listings.append(functools.partial(forge.repositories_organization, organization))
             else:
                 forge.logger.info("Skipping GitHub organization", organization=organization)
 
         for user in self.users:
             if user in select_users:
-                yield from forge.repositories_user(user)
+                listings.append(functools.partial(forge.repositories_user, user))
             else:
                 forge.logger.info("Skipping GitHub user", user=user)
 
         if select_self:
-            yield from forge.repositories_self()
+            listings.append(forge.repositories_self)
         else:
             forge.logger.info("Skipping GitHub self")
 
+        return listings
+
 
 class GitLabConfig(ForgeConfig):
     type: typing.Literal["gitlab"]
@@ -157,119 +230,121 @@ class GitLabConfig(ForgeConfig):
     groups: typing.Sequence[str] = pydantic.Field(default_factory=list)
     self: bool = pydantic.Field(default=True)
 
-    @property
-    def domain(self) -> str:
-        if self.base_url.host is None:
-            raise Exception(f"Could not determine host for {self.base_url!r}")
+    _forges: typing.Dict[ForgeKey, GitLab] = pydantic.PrivateAttr(default_factory=dict)
 
-        return self.base_url.host
+    def forge(self, workspace: pathlib.Path, request_slots: threading.Semaphore) -> GitLab:
+        """Create a client for the forge, reused by later calls with the same arguments."""
+        if (workspace, request_slots) in self._forges:
+            return self._forges[workspace, request_slots]
 
-    def forge(self, workspace: pathlib.Path) -> GitLab:
-        if self.base_url.host is None:
-            raise Exception(f"Could not determine host for {self.base_url!r}")
+        import gitlab
+
+        from git_river.forge import GitLab
 
         client = gitlab.Gitlab(
             url=self.base_url,
             private_token=self.private_token.get_secret_value(),
+            session=http_session(),
         )
 
-        return GitLab(
+        forge = self._forges[workspace, request_slots] = GitLab(
             client=client,
-            domain=self.base_url.host,
+            domain=self.domain,
             gitconfig=self.git_config_options(),
             workspace=workspace,
+            request_slots=request_slots,
         )
+        return forge
 
-    def all_repositories(
+    def all_listings(
         self,
         workspace: pathlib.Path,
-    ) -> typing.Iterable[RemoteRepository]:
-        forge = self.forge(workspace)
+        request_slots: threading.Semaphore,
+    ) -> typing.List[Listing]:
+        forge = self.forge(workspace, request_slots)
+        listings: typing.List[Listing] = []
 
         for group in self.groups:
-            yield from forge.repositories_group(group)
+            listings.append(functools.partial(forge.repositories_group, group))
 
         for user in self.users:
-            yield from forge.repositories_user(user)
+            listings.append(functools.partial(forge.repositories_user, user))
 
         if self.self:
-            yield from forge.repositories_self()
+            listings.append(forge.repositories_self)
 
-    def select_repositories(
+        return listings
+
+    def select_listings(
         self,
         workspace: pathlib.Path,
+        request_slots: threading.Semaphore,
         select_self: bool,
         select_users: typing.Sequence[str],
         select_groups: typing.Sequence[str],
-    ) -> typing.Iterable[RemoteRepository]:
-        forge = self.forge(workspace)
+    ) -> typing.List[Listing]:
+        forge = self.forge(workspace, request_slots)
+        listings: typing.List[Listing] = []
 
         for group in self.groups:
             if group in select_groups:
-                yield from forge.repositories_group(group)
+                listings.append(functools.partial(forge.repositories_group, group))
             else:
                 forge.logger.info("Skipping GitLab group", group=group)
 
         for user in self.users:
             if user in select_users:
-                yield from forge.repositories_user(user)
+                listings.append(functools.partial(forge.repositories_user, user))
             else:
                 forge.logger.info("Skipping GitLab user", user=user)
 
         if select_self:
-            yield from forge.repositories_self()
+            listings.append(forge.repositories_self)
         else:
             forge.logger.info("Skipping GitLab self")
 
+        return listings
+
+
+def read_config_file() -> typing.Dict[str, typing.Any]:
+    path = config_path()
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        logger.debug("No config file exists", path=path.as_posix())
+        return {}
 
-class Config(pydantic.BaseSettings):
-    workspace: pathlib.Path = pydantic.Field(env="GIT_RIVER_WORKSPACE", default=None)
+    logger.debug("Parsing config file", path=path.as_posix())
+    return json.loads(data)
+
+
+class Config(pydantic.BaseModel):
+    workspace: pathlib.Path = pydantic.Field(default=None)
     forges: typing.Mapping[str, typing.Union[GitHubConfig, GitLabConfig]] = pydantic.Field(
         default_factory=dict
     )
 
-    class Config:
-        env_prefix = "UPSTREAM_"
-        env_file_encoding = "utf-8"
-
-        extra = pydantic.Extra.ignore
-
-        @classmethod
-        def config_settings(cls, _: Config) -> typing.Dict[str, typing.Any]:
-            if not CONFIG_PATH.exists():
-                logger.debug("No config file exists", path=CONFIG_PATH.as_posix())
-                return {}
-
-            logger.debug("Parsing config file", path=CONFIG_PATH.as_posix())
-            return json.loads(CONFIG_PATH.read_text())
-
-        @classmethod
-        def customise_sources(
-            cls,
-            init_settings: pydantic.env_settings.SettingsSourceCallable,
-            env_settings: pydantic.env_settings.SettingsSourceCallable,
-            file_secret_settings: pydantic.env_settings.SettingsSourceCallable,
-        ):
-            return (
-                init_settings,
-                env_settings,
-                file_secret_settings,
-                cls.config_settings,
-            )
-
     @classmethod
-    @pydantic.validator("workspace")
-    def workspace_path_must_be_set(cls, value: typing.Optional[pathlib.Path]) -> pathlib.Path:
-        if value is None:
-            raise ValueError(
+    def load(cls) -> Config:
+        """Load the config file, with the workspace overridden by 'GIT_RIVER_WORKSPACE'."""
+        settings = read_config_file()
+
+        if (workspace := os.environ.get("GIT_RIVER_WORKSPACE")) is not None:
+            settings["workspace"] = workspace
+
+        return cls(**settings)
+
+    def require_workspace(self) -> pathlib.Path:
+        if self.workspace is None:
+            raise click.UsageError(
                 "Workspace is not configured - set 'workspace' in {config_path} or set the "
-                "'GIT_RIVER_WORKSPACE' environment variable".format(config_path=CONFIG_PATH)
+                "'GIT_RIVER_WORKSPACE' environment variable".format(config_path=config_path())
             )
 
-        return value
+        return self.workspace
 
     def repository_from_url(self, url: str) -> RemoteRepository:
-        return RemoteRepository.from_url(self.workspace, url)
+        return RemoteRepository.from_url(self.require_workspace(), url)
 
     def all_forges(self) -> typing.Sequence[ForgeConfig]:
         return [forge for forge in self.forges.values()]
@@ -278,24 +353,23 @@ class Config(pydantic.BaseSettings):
         return [forge for name, forge in self.forges.items() if name in names]
 
 
-def configure_logging() -> None:
-    structlog.configure(
-        processors=[
-            structlog.processors.add_log_level,
-            structlog.processors.StackInfoRenderer(),
-            structlog.dev.set_exc_info,
-            structlog.processors.format_exc_info,
-            structlog.dev.ConsoleRenderer(sort_keys=False),
-        ],
-        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
-        logger_factory=structlog.PrintLoggerFactory(),
-    )
+def load_config(ctx: click.Context) -> Config:
+    """Load the config the first time a command needs it, and share it with later commands."""
+    root = ctx.find_root()
+    if root.obj is None:
+        try:
+            root.obj = Config.load()
+        except pydantic.ValidationError as error:
+            raise click.UsageError(str(error)) from error
 
-    CACHE_DIRECTORY.mkdir(exist_ok=True)
-    handler = logging.handlers.RotatingFileHandler(
-        filename=str(CACHE_DIRECTORY / "debug.log"),
-        maxBytes=1024 * 1024,
-    )
-    handler.setFormatter(logging.Formatter("{asctime}:{levelname}:{name}:{message}", style="{"))
-    logging.getLogger().addHandler(handler)
-    logging.getLogger().setLevel(logging.DEBUG)
+    return root.obj
+
+
+def pass_config(f: typing.Callable[..., T]) -> typing.Callable[..., T]:
+    """Like 'click.pass_obj', but only loads the config for commands that use it."""
+
+    @click.pass_context
+    def new_func(ctx: click.Context, *args: typing.Any, **kwargs: typing.Any) -> T:
+        return ctx.invoke(f, load_config(ctx), *args, **kwargs)
+
+    return functools.update_wrapper(new_func, f)
@@ -16,46 +16,112 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
+import functools
+import importlib
 import typing
 
 import click
 import click._termui_impl
 import structlog.dev
-import colorama
 
 T = typing.TypeVar("T")
 
+LEVEL_STYLES = structlog.dev.ConsoleRenderer.get_default_level_styles()
+LEVEL_STYLES["progress"] = "\x1b[35m"  # colorama.Fore.MAGENTA
+RENDERER = structlog.dev.ConsoleRenderer(level_styles=LEVEL_STYLES)
+
+
+@functools.lru_cache(maxsize=32)
+def render_template(event: str, items: typing.Tuple[typing.Tuple[str, str], ...]) -> str:
+    return RENDERER(
+        logger=None,
+        name="",
+        event_dict={
+            "progress": "%(bar)s %(info)s",
+            "event": event,
+            "level": "progress",
+            **dict(items),
+        },
+    )
+
+
+def show_item(
+    item_show_func: typing.Callable[[T], str], item: typing.Optional[T]
+) -> typing.Optional[str]:
+    return item_show_func(item) if item is not None else None
+
 
 def progressbar(
-    iterable: typing.Iterable[T],
+    iterable: typing.Optional[typing.Iterable[T]] = None,
+    *,
     event: str,
     item_show_func: typing.Callable[[T], str],
+    length: typing.Optional[int] = None,
     **kwargs: str,
 ) -> click._termui_impl.ProgressBar[T]:
     """
     A very silly wrapper around 'click.progressbar' that matches the styling of
     'structlog.dev.ConsoleRenderer'.
+
+    Pass 'length' instead of 'iterable' to advance the bar manually with 'update()'.
     """
 
-    level_styles = structlog.dev.ConsoleRenderer.get_default_level_styles()
-    level_styles["progress"] = colorama.Fore.MAGENTA
-    renderer = structlog.dev.ConsoleRenderer(level_styles=level_styles)
-    template = renderer(
-        logger=None,
-        name="",
-        event_dict={
-            "progress": "%(bar)s %(info)s",
-            "event": event,
-            "level": "progress",
-            **kwargs,
-        },
-    )
+    template = render_template(event, tuple(kwargs.items()))
 
     return click.progressbar(
         iterable,
+        length=length,
         bar_template=template,
         info_sep=" ",
-        item_show_func=lambda x: item_show_func(x) if x is not None else None,
+        item_show_func=functools.partial(show_item, item_show_func),
         show_pos=True,
         width=25,
     )
+
+
+class LazyGroup(click.Group):
+    """
+    A 'click.Group' that only imports a subcommand's module when that subcommand is used.
+
+    Subcommands are given as a map of command names to 'module:attribute' import paths. Help text
+    for subcommands can be given in 'lazy_help', so that listing them doesn't import them.
+    """
+
+    def __init__(
+        self,
+        *args: typing.Any,
+        lazy_commands: typing.Mapping[str, str],
+        lazy_help: typing.Optional[typing.Mapping[str, str]] = None,
+        **kwargs: typing.Any,
+    ):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands
+        self.lazy_help = lazy_help or {}
+
+    def list_commands(self, ctx: click.Context) -> typing.List[str]:
+        return sorted({*super().list_commands(ctx), *self.lazy_commands})
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> typing.Optional[click.Command]:
+        if cmd_name in self.lazy_commands and cmd_name not in self.commands:
+            module_name, attribute = self.lazy_commands[cmd_name].split(":")
+            command = getattr(importlib.import_module(module_name), attribute)
+            self.add_command(command, cmd_name)
+
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        """Like 'click.Group.format_commands', but uses 'lazy_help' for unimported commands."""
+        commands: typing.List[typing.Tuple[str, click.Command]] = []
+        for name in self.list_commands(ctx):
+            if name in self.lazy_help and name not in self.commands:
+                # A placeholder with the same help text, so it is formatted identically.
+                commands.append((name, click.Command(name, help=self.lazy_help[name])))
+            elif (command := self.get_command(ctx, name)) is not None and not command.hidden:
+                commands.append((name, command))
+
+        if commands:
+            limit = formatter.width - 6 - max(len(name) for name, _ in commands)
+            with formatter.section("Commands"):
+                formatter.write_dl(
+                    [(name, command.get_short_help_str(limit)) for name, command in commands]
+                )
@@ -16,16 +16,18 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
-import typing
+from __future__ import annotations
 
-import gitlab.v4.objects
+import typing
 
+if typing.TYPE_CHECKING:
+    import gitlab.v4.objects
 
-GitLabProject = typing.Union[
-    gitlab.v4.objects.GroupProject,
-    gitlab.v4.objects.Project,
-    gitlab.v4.objects.UserProject,
-]
+    GitLabProject = typing.Union[
+        gitlab.v4.objects.GroupProject,
+        gitlab.v4.objects.Project,
+        gitlab.v4.objects.UserProject,
+    ]
 
 
 class ForkedFromProject(typing.TypedDict):
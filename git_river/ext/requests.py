@@ -0,0 +1,174 @@
+# This file is part of git-river.
+#
+# Copyright Datto, Inc.
+# Author: Sam Clements <sclements@datto.com>
+#
+# Licensed under the Mozilla Public License Version 2.0.
+# Fedora-License-Identifier: MPLv2.0
+# SPDX-2.0-License-Identifier: MPL-2.0
+# SPDX-3.0-License-Identifier: MPL-2.0
+#
+# git-river is open source software.
+# For more information on the license, see LICENSE.
+# For more information on open source software, see https://opensource.org/osd.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import hashlib
+import json
+import os
+import pathlib
+import threading
+import typing
+
+import requests
+import requests.adapters
+import requests.structures
+import structlog
+
+logger = structlog.get_logger(logger_name=__name__)
+
+# Headers that describe the encoded response body or the connection, not the cached content.
+SKIP_HEADERS = {
+    "connection",
+    "content-encoding",
+    "content-length",
+    "keep-alive",
+    "transfer-encoding",
+}
+
+# Request headers that identify the client, so responses are never shared between credentials.
+IDENTITY_HEADERS = ("authorization", "private-token")
+
+
+class CacheEntry(typing.TypedDict):
+    etag: str
+    headers: typing.Dict[str, str]
+    content: str
+
+
+class ETagCacheAdapter(requests.adapters.HTTPAdapter):
+    """
+    Send conditional GET requests using the ETag of a previous response, and rebuild that response
+    from the cache when the server replies '304 Not Modified'.
+
+    Entries are loaded from and saved to a JSON file, so they persist between invocations. Set
+    'refresh' to download every response again, while still updating the cache. Cached responses
+    are also used when the server can't be reached. Entries that weren't requested during a run are
+    dropped when the cache is saved, so listings that are no longer used don't accumulate.
+    """
+
+    def __init__(self, path: pathlib.Path, refresh: bool = False, **kwargs: typing.Any) -> None:
+        super().__init__(**kwargs)
+        self.path = path
+        self.refresh = refresh
+        self.entries = self._load()
+        self.modified = False
+        self.requested: typing.Set[str] = set()
+        self.lock = threading.Lock()
+
+    def send(  # type: ignore[override]
+        self,
+        request: requests.PreparedRequest,
+        **kwargs: typing.Any,
+    ) -> requests.Response:
+        if request.method != "GET":
+            return super().send(request, **kwargs)
+
+        key = self._key(request)
+        with self.lock:
+            entry = self.entries.get(key)
+            self.requested.add(key)
+
+        if entry is not None and not self.refresh:
+            request.headers["If-None-Match"] = entry["etag"]
+
+        try:
+            response = super().send(request, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as error:
+            if entry is None:
+                raise
+
+            # Serve the last known response, so that commands still work offline.
+            logger.warning("Using stale cached response", url=request.url, error=str(error))
+            return self._cached_response(requests.Response(), request, entry)
+
+        if response.status_code == 304 and entry is not None:
+            logger.debug("Using cached response", url=request.url)
+            # Return the connection to the pool before the body is replaced with the cached one.
+            response.raw.drain_conn()
+            response.raw.release_conn()
+            self._cached_response(response, request, entry)
+        elif response.status_code == 200 and "ETag" in response.headers:
+            try:
+                content = response.content.decode("utf-8")
+            except UnicodeDecodeError:
+                return response
+
+            headers = {k: v for k, v in response.headers.items() if k.lower() not in SKIP_HEADERS}
+            with self.lock:
+                self.entries[key] = {
+                    "etag": response.headers["ETag"],
+                    "headers": headers,
+                    "content": content,
+                }
+                self.modified = True
+
+        return response
+
+    @staticmethod
+    def _cached_response(
+        response: requests.Response,
+        request: requests.PreparedRequest,
+        entry: CacheEntry,
+    ) -> requests.Response:
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = requests.structures.CaseInsensitiveDict(entry["headers"])
+        response._content = entry["content"].encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = request.url or ""
+        response.request = request
+        return response
+
+    def save(self) -> None:
+        """Write the cache to disk if it changed. The file is only readable by the current user."""
+        with self.lock:
+            # Keep every entry if nothing was requested, e.g. when a command failed early.
+            unused = self.entries.keys() - self.requested if self.requested else set()
+            if not self.modified and not unused:
+                return
+
+            for key in unused:
+                del self.entries[key]
+
+            data = json.dumps(self.entries)
+            self.modified = False
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+        logger.debug("Saved HTTP cache", path=self.path.as_posix(), entries=len(self.entries))
+
+    def _load(self) -> typing.Dict[str, CacheEntry]:
+        try:
+            return json.loads(self.path.read_bytes())
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.warning("Ignoring invalid HTTP cache", path=self.path.as_posix())
+            return {}
+
+    @staticmethod
+    def _key(request: requests.PreparedRequest) -> str:
+        identity = hashlib.sha256()
+        for header in IDENTITY_HEADERS:
+            value = request.headers.get(header, "")
+            identity.update(value.encode("utf-8") if isinstance(value, str) else value)
+            identity.update(b"\0")
+        return f"{identity.hexdigest()} {request.url}"
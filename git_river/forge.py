@@ -16,60 +16,91 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
+from __future__ import annotations
+
 import abc
+import concurrent.futures
 import dataclasses
+import itertools
+import os
 import pathlib
+import threading
 import typing
 
-import github
-import gitlab
 import structlog
 
-from git_river.ext.gitlab import GitLabProject, forked_from_project
+from git_river.ext.gitlab import forked_from_project
 from git_river.repository import GitConfig, GitConfigKey, RemoteRepository
 
-
-logger = structlog.get_logger(logger_name=__name__)
+if typing.TYPE_CHECKING:
+    import github
+    import gitlab
 
 
-class Forge(abc.ABC):
-    pass
+logger = structlog.get_logger(logger_name=__name__)
 
 
 @dataclasses.dataclass()
-class GitHub(Forge):
-    client: github.Github
+class Forge(abc.ABC):
     domain: str
     gitconfig: GitConfig
     workspace: pathlib.Path
+    # Bounds the API requests made at once, shared by every forge listed in the same command.
+    # Slots are never held while waiting on another thread, so nested thread pools can't deadlock.
+    request_slots: threading.Semaphore
 
     logger: structlog.BoundLogger = dataclasses.field(init=False)
+    origin_config: GitConfig = dataclasses.field(init=False, repr=False)
+    fork_config: GitConfig = dataclasses.field(init=False, repr=False)
+    domain_path: str = dataclasses.field(init=False, repr=False)
 
     def __post_init__(self):
-        self.logger = logger.bind(type="GitHub", domain=self.domain)
+        self.logger = logger.bind(type=type(self).__name__, domain=self.domain)
+        self.domain_path = os.path.join(self.workspace, self.domain)
+        # Shared by every repository from this forge, which only read their config.
+        self.origin_config = {GitConfigKey("remote", "pushdefault"): "origin", **self.gitconfig}
+        self.fork_config = {GitConfigKey("remote", "pushdefault"): "downstream", **self.gitconfig}
+
+
+@dataclasses.dataclass()
+class GitHub(Forge):
+    # PyGithub clients keep the state of the current request on a shared connection object, so
+    # each listing creates its own client instead of sharing one between threads.
+    client_factory: typing.Callable[[], github.Github]
 
-    def repositories_organization(self, organization: str) -> typing.Iterable[RemoteRepository]:
+    def repositories_organization(self, organization: str) -> typing.Iterator[RemoteRepository]:
         self.logger.info("Listing GitHub organisation repos", id=organization)
-        repos = self.client.get_organization(organization).get_repos()
-        return [self._into_repository(repo) for repo in repos]
+        with self.request_slots:
+            repos = self.client_factory().get_organization(organization).get_repos()
+            yield from self._repositories(repos)
 
-    def repositories_user(self, user: str) -> typing.Iterable[RemoteRepository]:
+    def repositories_user(self, user: str) -> typing.Iterator[RemoteRepository]:
         self.logger.info("Listing GitHub user repos", id=user)
-        repos = self.client.get_user(user).get_repos()
-        return [self._into_repository(repo) for repo in repos]
-
-    def repositories_self(self) -> typing.Iterable[RemoteRepository]:
-        auth = self.client.get_user()
-        self.logger.info("Listing GitHub self repos", id=auth.login)
-        repos = self.client.get_user(auth.login).get_repos()
-        return [self._into_repository(repo) for repo in repos]
+        with self.request_slots:
+            repos = self.client_factory().get_user(user).get_repos()
+            yield from self._repositories(repos)
+
+    def repositories_self(self) -> typing.Iterator[RemoteRepository]:
+        with self.request_slots:
+            client = self.client_factory()
+            auth = client.get_user()
+            self.logger.info("Listing GitHub self repos", id=auth.login)
+            repos = client.get_user(auth.login).get_repos()
+            yield from self._repositories(repos)
+
+    def _repositories(self, repos) -> typing.Iterator[RemoteRepository]:
+        # Archived repositories are only used to warn about local clones, so skip building the
+        # rest. GitLab filters them out in the API request instead.
+        for repo in repos:
+            if not repo.archived or os.path.exists(os.path.join(self.domain_path, repo.full_name)):
+                yield self._into_repository(repo)
 
     def _into_repository(self, repository) -> RemoteRepository:
         if repository.parent is None:
-            remote_config = {GitConfigKey("remote", "pushdefault"): "origin"}
+            config = self.origin_config
             remotes = {"origin": repository.ssh_url}
         else:
-            remote_config = {GitConfigKey("remote", "pushdefault"): "downstream"}
+            config = self.fork_config
             remotes = {
                 "origin": None,
                 "upstream": repository.parent.ssh_url,
@@ -78,10 +109,10 @@ class GitHub(Forge):
 
         return RemoteRepository(
             clone_url=repository.ssh_url,
-            config={**remote_config, **self.gitconfig},
+            config=config,
             group=self.domain,
             name=f"{self.domain}/{repository.full_name}",
-            path=self.workspace / self.domain / repository.full_name,
+            path=pathlib.Path(self.domain_path, repository.full_name),
             remotes=remotes,
             default_branch=repository.default_branch,
             archived=repository.archived,
@@ -91,65 +122,82 @@ class GitHub(Forge):
 @dataclasses.dataclass()
 class GitLab(Forge):
     client: gitlab.Gitlab
-    domain: str
-    gitconfig: GitConfig
-    workspace: pathlib.Path
 
-    logger: structlog.BoundLogger = dataclasses.field(init=False)
-
-    def __post_init__(self):
-        self.logger = logger.bind(type="GitLab", domain=self.domain)
-
-    def repositories_group(self, identifier: str) -> typing.Iterable[RemoteRepository]:
+    def repositories_group(self, identifier: str) -> typing.Iterator[RemoteRepository]:
         self.logger.info("Listing GitLab group projects", id=identifier)
         group = self.client.groups.get(identifier, lazy=True)
-        return self._repositories(group)
+        yield from self._repositories(group)
 
-    def repositories_user(self, identifier: str) -> typing.Iterable[RemoteRepository]:
+    def repositories_user(self, identifier: str) -> typing.Iterator[RemoteRepository]:
         self.logger.info("Listing GitLab user projects", id=identifier)
         user = self.client.users.get(identifier, lazy=True)
-        return self._repositories(user)
+        yield from self._repositories(user)
 
-    def repositories_self(self) -> typing.Iterable[RemoteRepository]:
+    def repositories_self(self) -> typing.Iterator[RemoteRepository]:
         self.logger.debug("Getting current GitLab user")
-        self.client.auth()
+        with self.request_slots:
+            self.client.auth()
 
-        if not self.client.user:
-            self.logger.debug("Not logged in")
-            return []
+            if not self.client.user:
+                self.logger.debug("Not logged in")
+                return
 
-        user = self.client.users.get(self.client.user.id)
+            user = self.client.users.get(self.client.user.id)
         self.logger.info("Listing GitLab self projects", id=user.username)
-        return self._repositories(user)
-
-    def _repositories(self, obj) -> typing.Iterable[RemoteRepository]:
-        projects = obj.projects.list(  # type: ignore
-            all=True,
-            per_page=100,
-            archived=False,
-            as_list=False,
-            include_subgroups=True,
-        )
-        return [self._into_repository(project) for project in projects]
+        yield from self._repositories(user)
+
+    def _repositories(self, obj) -> typing.Iterator[RemoteRepository]:
+        options = {"per_page": 100, "archived": False, "include_subgroups": True}
+
+        # Fetches the first page, and the pagination headers describing the rest.
+        with self.request_slots:
+            projects = obj.projects.list(all=True, as_list=False, **options)  # type: ignore
+        total_pages, per_page = projects.total_pages, projects.per_page
+
+        if not total_pages or not per_page or total_pages == 1:
+            # GitLab omits the totals for very large collections, so follow the 'next' links.
+            with self.request_slots:
+                for project in projects:
+                    yield self._into_repository(project)
+            return
+
+        self.logger.debug("Fetching pages concurrently", pages=total_pages)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(8, total_pages - 1)) as executor:
+            pages = [
+                executor.submit(self._list_page, obj, page, options)
+                for page in range(2, total_pages + 1)
+            ]
+
+            # Only take the first page from the iterator, so that it doesn't fetch the others.
+            for project in itertools.islice(projects, per_page):
+                yield self._into_repository(project)
+
+            for page in pages:
+                for project in page.result():
+                    yield self._into_repository(project)
+
+    def _list_page(self, obj, page: int, options: typing.Dict[str, typing.Any]) -> typing.List:
+        with self.request_slots:
+            return obj.projects.list(page=page, **options)
 
     def _into_repository(self, project) -> RemoteRepository:
         if parent := forked_from_project(project):
-            remote_config = {GitConfigKey("remote", "pushdefault"): "downstream"}
+            config = self.fork_config
             remotes = {
                 "origin": None,
                 "upstream": parent["ssh_url_to_repo"],
                 "downstream": project.ssh_url_to_repo,
             }
         else:
-            remote_config = {GitConfigKey("remote", "pushdefault"): "origin"}
+            config = self.origin_config
             remotes = {"origin": project.ssh_url_to_repo}
 
         return RemoteRepository(
             clone_url=project.ssh_url_to_repo,
-            config={**remote_config, **self.gitconfig},
+            config=config,
             group=self.domain,
             name=project.path_with_namespace,
-            path=self.workspace / self.domain / project.path_with_namespace,
+            path=pathlib.Path(self.domain_path, project.path_with_namespace),
             remotes=remotes,
             default_branch=project.default_branch,
             archived=project.archived,
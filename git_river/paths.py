@@ -0,0 +1,49 @@
+# This file is part of git-river.
+#
+# Copyright Datto, Inc.
+# Author: Sam Clements <sclements@datto.com>
+#
+# Licensed under the Mozilla Public License Version 2.0.
+# Fedora-License-Identifier: MPLv2.0
+# SPDX-2.0-License-Identifier: MPL-2.0
+# SPDX-3.0-License-Identifier: MPL-2.0
+#
+# git-river is open source software.
+# For more information on the license, see LICENSE.
+# For more information on open source software, see https://opensource.org/osd.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import functools
+import os
+import pathlib
+import sys
+
+import git_river
+
+
+def user_directory(xdg_variable: str, xdg_default: str, appdirs_function: str) -> pathlib.Path:
+    """Follow the XDG base directory spec on Linux, and use appdirs on other platforms."""
+    if sys.platform.startswith("linux"):
+        base = os.environ.get(xdg_variable) or os.path.expanduser(xdg_default)
+        return pathlib.Path(base, git_river.__app__)
+
+    import appdirs
+
+    return pathlib.Path(getattr(appdirs, appdirs_function)(git_river.__app__))
+
+
+@functools.lru_cache(maxsize=None)
+def config_directory() -> pathlib.Path:
+    return user_directory("XDG_CONFIG_HOME", "~/.config", "user_config_dir")
+
+
+@functools.lru_cache(maxsize=None)
+def cache_directory() -> pathlib.Path:
+    return user_directory("XDG_CACHE_HOME", "~/.cache", "user_cache_dir")
+
+
+def config_path() -> pathlib.Path:
+    return config_directory() / "config.json"
@@ -18,22 +18,45 @@
 
 from __future__ import annotations
 
+import concurrent.futures
 import configparser
 import dataclasses
-import os
+import functools
 import pathlib
+import re
 import typing
 
 import click
 import git
-import giturlparse
-import inflect
 import structlog
 
-p = inflect.engine()
-
 logger = structlog.get_logger(logger_name=__name__)
 
+# Matches URLs with a scheme ('https://host/path', 'ssh://user@host:port/path') and scp-like SSH
+# URLs ('user@host:path').
+GIT_URL = re.compile(
+    r"""
+    ^(?:
+        [a-z][a-z0-9+.-]*://(?:[^@/]+@)?(?P<host>[^/:]+)(?::\d*)?/
+        |
+        (?:[^@/:]+@)?(?P<scp_host>[^/:]+):
+    )
+    (?P<path>.+)$
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+
+# Characters with a special meaning in the patterns given to 'git for-each-ref'.
+GLOB_CHARACTERS = re.compile(r"[\\*?[\]]")
+
+
+def _join_and(items: typing.Sequence[str]) -> str:
+    """Join words into a list like "'a', 'b', and 'c'", using a serial comma."""
+    if len(items) <= 2:
+        return " and ".join(items)
+
+    return f"{', '.join(items[:-1])}, and {items[-1]}"
+
 
 class Missing(ValueError):
     pass
@@ -51,6 +74,7 @@ class GitConfigKey:
         return f"{self.section}.{self.option}"
 
     @classmethod
+    @functools.lru_cache(maxsize=256)
     def parse(cls, key: str) -> GitConfigKey:
         section, option = key.split(".", maxsplit=1)
         return cls(section, option)
@@ -87,21 +111,29 @@ class RemoteRepository(Repository):
     repo: typing.Optional[git.Repo] = dataclasses.field(default=None)
     default_branch: typing.Optional[str] = dataclasses.field(default=None)
 
+    local_repo: typing.Optional[LocalRepository] = dataclasses.field(
+        default=None, init=False, repr=False, compare=False
+    )
+
     @classmethod
     def from_url(cls, workspace: pathlib.Path, url: str) -> RemoteRepository:
-        parsed = giturlparse.parse(url)
-        project, _ = os.path.splitext(parsed.pathname.removeprefix("/"))
-        path = workspace.joinpath(parsed.domain, project)
+        match = GIT_URL.match(url)
+        if match is None:
+            raise Exception(f"Failed to parse repository url ({url=})")
+
+        domain = match["host"] or match["scp_host"]
+        project = match["path"].removesuffix(".git")
+        path = workspace.joinpath(domain, project)
 
         logger.debug(
             "Parsed repository from URL",
             url=url,
             path=path.as_posix(),
-            domain=parsed.domain,
+            domain=domain,
             project=project,
         )
 
-        if pathlib.Path(project).is_absolute():
+        if project.startswith("/"):
             raise Exception(f"Failed to parse repository url safely ({project=})")
 
         return cls(
@@ -110,7 +142,7 @@ class RemoteRepository(Repository):
             clone_url=url,
             config={},
             remotes={},
-            group=parsed.domain,
+            group=domain,
             default_branch=None,
             archived=False,
         )
@@ -139,16 +171,19 @@ class RemoteRepository(Repository):
         return self.repo
 
     def as_local_repo(self) -> LocalRepository:
-        repo = self.ensure_repo()
-        return LocalRepository(
-            name=self.name,
-            path=self.path,
-            config=self.config,
-            remotes=self.remotes,
-            archived=self.archived,
-            repo=repo,
-            default_branch=self.default_branch,
-        )
+        """Open the local repository, reusing it if it has already been opened."""
+        if self.local_repo is None:
+            self.local_repo = LocalRepository(
+                name=self.name,
+                path=self.path,
+                config=self.config,
+                remotes=self.remotes,
+                archived=self.archived,
+                repo=self.ensure_repo(),
+                default_branch=self.default_branch,
+            )
+
+        return self.local_repo
 
 
 @dataclasses.dataclass()
@@ -172,17 +207,26 @@ class LocalRepository(Repository):
         log = self.bind(logger)
         log.debug("Configuring repository options")
 
-        with self.repo.config_writer() as writer:
+        # GitPython rewrites the config file after every change, so find the changes first and
+        # only take the write lock when there are some.
+        changes = {}
+        with self.repo.config_reader("repository") as reader:
             for key, value in self.config.items():
                 try:
-                    current = writer.get_value(key.section, key.option)
+                    current = reader.get_value(key.section, key.option)
                 except (configparser.NoSectionError, configparser.NoOptionError):
                     current = None
 
                 if current == value:
                     log.debug("Git config is correct", key=str(key), value=current)
-                    continue
+                else:
+                    changes[key] = value
 
+        if not changes:
+            return
+
+        with self.repo.config_writer() as writer:
+            for key, value in changes.items():
                 if value is None:
                     log.info("Removing git config", key=str(key))
                     writer.remove_option(section=key.section, option=key.option)
@@ -195,32 +239,30 @@ class LocalRepository(Repository):
         """Configure remote names and URLs."""
         self.bind(logger).debug("Configuring repository remotes")
 
+        # Read remotes from the git config once, instead of once for each configured remote.
+        existing = {remote.name: remote for remote in self.repo.remotes}
+
         for name, url in self.remotes.items():
             if url is None:
-                self.delete_remote(name)
+                if name in existing:
+                    self.delete_remote(existing[name])
+            elif name in existing:
+                self.update_remote(existing[name], url)
             else:
                 self.create_remote(name, url)
 
-    def delete_remote(self, name) -> None:
-        try:
-            remote = self.repo.remote(name)
-        except ValueError:
-            pass
-        else:
-            self.bind(logger).info("Deleting remote", remote=name)
-            self.repo.delete_remote(remote)
+    def delete_remote(self, remote: git.Remote) -> None:
+        self.bind(logger).info("Deleting remote", remote=remote.name)
+        self.repo.delete_remote(remote)
 
     def create_remote(self, name: str, url: str) -> None:
-        log = self.bind(logger)
-
-        try:
-            remote = self.repo.remote(name)
-        except ValueError:
-            log.info("Creating remote", remote=name, url=url)
-            remote = self.repo.create_remote(name, url)
+        self.bind(logger).info("Creating remote", remote=name, url=url)
+        self.repo.create_remote(name, url)
 
-        if set(remote.urls) != {url}:
-            log.warning("Updating remote", remote=name, new={url}, old=set(remote.urls))
+    def update_remote(self, remote: git.Remote, url: str) -> None:
+        urls = set(remote.urls)
+        if urls != {url}:
+            self.bind(logger).warning("Updating remote", remote=remote.name, new={url}, old=urls)
             remote.set_url(url)
 
     def update_remotes(self, prune: bool = True) -> None:
@@ -234,6 +276,7 @@ class LocalRepository(Repository):
         log = self.bind(logger).bind(target=target, dry_run=dry_run)
         merged_branches = self.merged(target)
         active_branch = self.repo.active_branch.name
+        delete_branches = []
         for merged_branch in merged_branches:
             if active_branch == merged_branch:
                 log.debug("Skipping current branch", head=merged_branch)
@@ -247,7 +290,11 @@ class LocalRepository(Repository):
                 log.info("Would delete branch", head=merged_branch)
             else:
                 log.info("Deleting branch", head=merged_branch)
-                self.repo.delete_head(merged_branch)
+                delete_branches.append(merged_branch)
+
+        # Delete all branches with a single 'git branch -d' instead of one process per branch.
+        if delete_branches:
+            self.repo.git.branch("-d", *delete_branches)
 
     def merged(self, target: str) -> typing.Set[str]:
         """Return a list of branches merged into a target branch."""
@@ -260,16 +307,25 @@ class LocalRepository(Repository):
             with_extended_output=True,
         )
         log.debug("Ran git branch", target=target, rc=rc, stdout=stdout, stderr=stderr)
-        merged = {line.lstrip() for line in stdout.splitlines()} - {target}
+        # '--format' lines have no indentation or '*' marker, unlike the default output.
+        merged = {line for line in stdout.splitlines() if line and line != target}
         log.debug("Found merged branches", target=target, merged=merged)
         return merged
 
     def merge_feature_branches(self, *, prefix: str = "feature/", target: str, merge: str) -> None:
         log = self.bind(logger).bind(prefix=prefix, target=target, merge=merge)
 
-        target_branch = self.repo.heads[target]
-
-        feature_branches = {head for head in self.repo.heads if head.name.startswith(prefix)}
+        # Look up branches by name, as 'repo.heads' reads every ref in the repository.
+        target_branch = git.Head(self.repo, f"refs/heads/{target}")
+        if not target_branch.is_valid():
+            raise click.UsageError(f"Target branch {target!r} does not exist")
+
+        # Let git filter refs by prefix. '*' doesn't match '/', so the second pattern matches
+        # branches nested below the prefix. The prefix is escaped so it is only matched literally.
+        escaped = GLOB_CHARACTERS.sub(r"\\\g<0>", prefix)
+        pattern = f"refs/heads/{escaped}*"
+        refs = self.repo.git.for_each_ref(pattern, f"{pattern}/**", format="%(refname)")
+        feature_branches = {git.Head(self.repo, ref) for ref in refs.splitlines()}
         if not feature_branches:
             raise click.UsageError("No feature branches found")
         for feature_branch in feature_branches:
@@ -277,9 +333,9 @@ class LocalRepository(Repository):
         base = self.repo.merge_base(*feature_branches)
         log.info("Found merge base", base=base)
 
-        if merge in self.repo.heads:
+        merge_branch = git.Head(self.repo, f"refs/heads/{merge}")
+        if merge_branch.is_valid():
             log.info("Using existing merge branch")
-            merge_branch = self.repo.heads[merge]
         else:
             log.info("Creating merge branch")
             merge_branch = self.repo.create_head(merge, target)
@@ -288,7 +344,7 @@ class LocalRepository(Repository):
         merge_branch.checkout()
 
         log.info("Resetting to target branch")
-        self.repo.head.reference = self.repo.heads[target]
+        self.repo.head.reference = target_branch
         self.repo.head.reset(index=True, working_tree=False)
 
         log.info("Merging into index")
@@ -296,7 +352,7 @@ class LocalRepository(Repository):
 
         log.info("Committing to merge branch")
         message = "WIP: Merge branches {branches} into '{target}'".format(
-            branches=p.join([f"'{branch}'" for branch in feature_branches]),
+            branches=_join_and([f"'{branch}'" for branch in feature_branches]),
             target=target_branch,
         )
         parent_commits = [branch.commit for branch in feature_branches]
@@ -392,3 +448,24 @@ class LocalRepository(Repository):
         except ValueError as error:
             raise Missing(f"No remote found named {name!r}") from error
         return remote.name
+
+
+def update_remotes_bulk(
+    repos: typing.Iterable[LocalRepository],
+    jobs: int,
+) -> typing.Iterator[typing.Tuple[LocalRepository, typing.Optional[git.GitCommandError]]]:
+    """
+    Update remotes for many repositories in parallel, yielding each one as it finishes.
+
+    Git errors are yielded alongside the repository instead of being raised, so that one failing
+    repository doesn't stop the others from being updated.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(repo.update_remotes): repo for repo in repos}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()
+            except git.GitCommandError as error:
+                yield futures[future], error
+            else:
+                yield futures[future], None
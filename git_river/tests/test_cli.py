@@ -0,0 +1,30 @@
+# This file is part of git-river.
+#
+# Copyright Datto, Inc.
+# Author: Sam Clements <sclements@datto.com>
+#
+# Licensed under the Mozilla Public License Version 2.0.
+# Fedora-License-Identifier: MPLv2.0
+# SPDX-2.0-License-Identifier: MPL-2.0
+# SPDX-3.0-License-Identifier: MPL-2.0
+#
+# git-river is open source software.
+# For more information on the license, see LICENSE.
+# For more information on open source software, see https://opensource.org/osd.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import click
+import pytest
+
+import git_river.cli
+
+
+@pytest.mark.parametrize("name", git_river.cli.main.lazy_commands)
+def test_lazy_help(name: str) -> None:
+    command = git_river.cli.main.get_command(click.Context(git_river.cli.main), name)
+
+    assert command is not None
+    assert git_river.cli.main.lazy_help[name] == command.get_short_help_str(limit=1000)
@@ -16,9 +16,11 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
+import copy
 import pathlib
 
 import pytest
+import git_river.config
 import git_river.repository
 
 
@@ -27,6 +29,7 @@ import git_river.repository
     [
         "https://gitlab.invalid/example-group/example-name.git",
         "git@gitlab.invalid:example-group/example-name.git",
+        "ssh://git@gitlab.invalid:2222/example-group/example-name.git",
     ],
 )
 def test_repository_from_url(tmp_path: pathlib.Path, url: str) -> None:
@@ -36,3 +39,16 @@ def test_repository_from_url(tmp_path: pathlib.Path, url: str) -> None:
     assert repo.group == "gitlab.invalid"
     assert repo.name == "example-name"
     assert repo.path == tmp_path / repo.group / "example-group" / "example-name"
+
+
+def test_forge_config_copy() -> None:
+    forge_config = git_river.config.GitLabConfig.parse_obj(
+        {
+            "type": "gitlab",
+            "private_token": "token",
+            "gitconfig": {"user.email": "user@example.invalid"},
+        }
+    )
+    forge_config.git_config_options()
+
+    assert copy.deepcopy(forge_config).git_config_options() == forge_config.git_config_options()
@@ -0,0 +1,112 @@
+# This file is part of git-river.
+#
+# Copyright Datto, Inc.
+# Author: Sam Clements <sclements@datto.com>
+#
+# Licensed under the Mozilla Public License Version 2.0.
+# Fedora-License-Identifier: MPLv2.0
+# SPDX-2.0-License-Identifier: MPL-2.0
+# SPDX-3.0-License-Identifier: MPL-2.0
+#
+# git-river is open source software.
+# For more information on the license, see LICENSE.
+# For more information on open source software, see https://opensource.org/osd.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+
+import pathlib
+import threading
+import types
+
+import click.testing
+import git
+
+import git_river.commands.forge
+import git_river.forge
+import git_river.repository
+
+
+def test_repository_manager_missing(tmp_path: pathlib.Path) -> None:
+    urls = [
+        "https://gitlab.invalid/example-group/cloned.git",
+        "https://gitlab.invalid/example-group/missing.git",
+        "https://gitlab.invalid/other-group/missing.git",
+    ]
+    repos = [
+        git_river.repository.RemoteRepository.from_url(workspace=tmp_path, url=url) for url in urls
+    ]
+    repos[0].path.mkdir(parents=True)
+
+    workspace = git_river.commands.forge.RepositoryManager()
+    workspace.extend(repos)
+
+    assert list(workspace.missing()) == repos[1:]
+    assert workspace.count_existing() == 1
+
+
+def test_clone_repositories_failure(tmp_path: pathlib.Path) -> None:
+    source = tmp_path / "source"
+    git.Repo.init(source).index.commit("Initial commit")
+
+    workspace = git_river.commands.forge.RepositoryManager()
+    workspace.extend(
+        git_river.repository.RemoteRepository.from_url(
+            workspace=tmp_path / "workspace", url=f"git@localhost:example/{name}.git"
+        )
+        for name in ("broken", "working")
+    )
+    for repo in workspace.repos:
+        repo.clone_url = (source if repo.name == "working" else tmp_path / "nothing").as_posix()
+
+    result = click.testing.CliRunner().invoke(
+        git_river.commands.forge.clone_repositories, ["--jobs", "1"], obj=workspace
+    )
+
+    assert result.exit_code == 1
+    assert "Failed to clone 1 of 2 repositories" in result.output
+    assert [repo.name for repo in workspace.missing()] == ["broken"]
+
+
+def test_github_repositories(tmp_path: pathlib.Path) -> None:
+    def repo(name: str, archived: bool = False, parent: object = None) -> types.SimpleNamespace:
+        return types.SimpleNamespace(
+            full_name=f"example/{name}",
+            ssh_url=f"git@github.invalid:example/{name}.git",
+            default_branch="main",
+            archived=archived,
+            parent=parent,
+        )
+
+    forge = git_river.forge.GitHub(
+        client_factory=None,  # type: ignore
+        domain="github.invalid",
+        gitconfig={git_river.repository.GitConfigKey.parse("user.email"): "user@example.invalid"},
+        workspace=tmp_path,
+        request_slots=threading.Semaphore(),
+    )
+    (tmp_path / "github.invalid" / "example" / "cloned-archive").mkdir(parents=True)
+
+    repos = list(
+        forge._repositories(
+            [
+                repo("origin"),
+                repo("fork", parent=repo("upstream")),
+                repo("archive", archived=True),
+                repo("cloned-archive", archived=True),
+            ]
+        )
+    )
+
+    assert [r.name for r in repos] == [
+        "github.invalid/example/origin",
+        "github.invalid/example/fork",
+        "github.invalid/example/cloned-archive",
+    ]
+    assert repos[0].path == tmp_path / "github.invalid" / "example" / "origin"
+    assert {str(key): value for key, value in repos[1].config.items()} == {
+        "remote.pushdefault": "downstream",
+        "user.email": "user@example.invalid",
+    }
@@ -0,0 +1,61 @@
+# This file is part of git-river.
+#
+# Copyright Datto, Inc.
+# Author: Sam Clements <sclements@datto.com>
+#
+# Licensed under the Mozilla Public License Version 2.0.
+# Fedora-License-Identifier: MPLv2.0
+# SPDX-2.0-License-Identifier: MPL-2.0
+# SPDX-3.0-License-Identifier: MPL-2.0
+#
+# git-river is open source software.
+# For more information on the license, see LICENSE.
+# For more information on open source software, see https://opensource.org/osd.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import pathlib
+import typing
+
+import click
+import git
+import pytest
+
+import git_river.repository
+
+
+@pytest.mark.parametrize(
+    "items,expected",
+    [
+        ([], ""),
+        (["a"], "a"),
+        (["a", "b"], "a and b"),
+        (["a", "b", "c"], "a, b, and c"),
+    ],
+)
+def test_join_and(items: typing.List[str], expected: str) -> None:
+    assert git_river.repository._join_and(items) == expected
+
+
+def test_merge_feature_branches(tmp_path: pathlib.Path) -> None:
+    repo = git.Repo.init(tmp_path, initial_branch="main")
+    base = repo.index.commit("Initial commit")
+    for name in ("feature/a", "feature/nested/b", "other"):
+        commit = repo.index.commit(name, parent_commits=[base], head=False)
+        repo.create_head(name, commit)
+
+    local = git_river.repository.LocalRepository.from_path(tmp_path)
+    local.merge_feature_branches(target="main", merge="merged")
+
+    assert {parent.message for parent in repo.head.commit.parents} == {
+        "feature/a",
+        "feature/nested/b",
+    }
+
+    with pytest.raises(click.UsageError, match="No feature branches found"):
+        local.merge_feature_branches(prefix="feature/[a]", target="main", merge="merged")
+
+    with pytest.raises(click.UsageError, match="does not exist"):
+        local.merge_feature_branches(target="missing", merge="merged")
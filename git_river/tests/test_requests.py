@@ -0,0 +1,166 @@
+# This file is part of git-river.
+#
+# Copyright Datto, Inc.
+# Author: Sam Clements <sclements@datto.com>
+#
+# Licensed under the Mozilla Public License Version 2.0.
+# Fedora-License-Identifier: MPLv2.0
+# SPDX-2.0-License-Identifier: MPL-2.0
+# SPDX-3.0-License-Identifier: MPL-2.0
+#
+# git-river is open source software.
+# For more information on the license, see LICENSE.
+# For more information on open source software, see https://opensource.org/osd.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import http.server
+import json
+import pathlib
+import threading
+import typing
+
+import pytest
+import requests
+
+import git_river.ext.requests
+
+ETAG = '"v1"'
+BODY = b'[{"id": 1}]'
+
+
+class Server(http.server.ThreadingHTTPServer):
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.requests: typing.List[typing.Tuple[int, typing.Optional[str]]] = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/projects"
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: Server
+
+    def do_GET(self) -> None:
+        if_none_match = self.headers.get("If-None-Match")
+        self.server.requests.append((self.client_address[1], if_none_match))
+
+        if if_none_match == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args: typing.Any) -> None:
+        pass
+
+
+@pytest.fixture()
+def server() -> typing.Iterator[Server]:
+    server = Server()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def session(adapter: git_river.ext.requests.ETagCacheAdapter) -> requests.Session:
+    session = requests.Session()
+    session.mount("http://", adapter)
+    return session
+
+
+def test_etag_cache(server: Server, tmp_path: pathlib.Path) -> None:
+    adapter = git_river.ext.requests.ETagCacheAdapter(tmp_path / "http.json")
+    client = session(adapter)
+
+    first = client.get(server.url)
+    assert first.status_code == 200
+    assert len(adapter.entries) == 1
+    assert adapter.modified
+
+    for _ in range(3):
+        response = client.get(server.url)
+        assert response.status_code == 200
+        assert response.content == BODY
+        assert response.json() == [{"id": 1}]
+
+    assert [if_none_match for _, if_none_match in server.requests] == [None] + [ETAG] * 3
+    assert len({port for port, _ in server.requests}) == 1
+
+
+def test_etag_cache_refresh(server: Server, tmp_path: pathlib.Path) -> None:
+    adapter = git_river.ext.requests.ETagCacheAdapter(tmp_path / "http.json", refresh=True)
+    client = session(adapter)
+
+    client.get(server.url)
+    client.get(server.url)
+
+    assert [if_none_match for _, if_none_match in server.requests] == [None, None]
+    assert len(adapter.entries) == 1
+
+
+def test_etag_cache_save(server: Server, tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "cache" / "http.json"
+    adapter = git_river.ext.requests.ETagCacheAdapter(path)
+
+    adapter.save()
+    assert not path.exists()
+
+    session(adapter).get(server.url)
+    adapter.save()
+    assert path.exists()
+    assert not adapter.modified
+
+    path.unlink()
+    adapter.save()
+    assert not path.exists()
+
+
+def test_etag_cache_prune(server: Server, tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "http.json"
+    adapter = git_river.ext.requests.ETagCacheAdapter(path)
+    client = session(adapter)
+    client.get(server.url)
+    client.get(server.url + "?page=2")
+    adapter.save()
+
+    adapter = git_river.ext.requests.ETagCacheAdapter(path)
+    adapter.save()
+    assert len(json.loads(path.read_bytes())) == 2
+
+    session(adapter).get(server.url)
+    adapter.save()
+    assert list(json.loads(path.read_bytes())) == list(adapter.entries)
+    assert len(adapter.entries) == 1
+
+
+def test_etag_cache_offline(server: Server, tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "http.json"
+    adapter = git_river.ext.requests.ETagCacheAdapter(path)
+    session(adapter).get(server.url)
+    adapter.save()
+
+    server.shutdown()
+    server.server_close()
+
+    # A new adapter has no pooled connections, so requests fail to connect.
+    offline = session(git_river.ext.requests.ETagCacheAdapter(path))
+    response = offline.get(server.url)
+    assert response.status_code == 200
+    assert response.content == BODY
+
+    with pytest.raises(requests.ConnectionError):
+        offline.get(server.url + "?page=2")